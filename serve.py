@@ -1,26 +1,38 @@
 import asyncio
+import itertools
 import json
 import os
 import re
 import time
-from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, List, Literal, Optional
-
-from fastapi import FastAPI, HTTPException
-from langchain_core.messages import HumanMessage
-from pydantic import BaseModel, Field
-from sqlalchemy import select
-
-from deep_research.db import TaskRecordDB, init_db, session_scope, utcnow
+from typing import Any, Dict, Iterator, List, Optional
+
+import orjson
+from fastapi import FastAPI, HTTPException, Response
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+
+from deep_research.api_models import (
+    ResearchRequest,
+    ResearchResponse,
+    ResearchTaskSummary,
+    TaskRecord,
+    TaskStatus,
+    build_state,
+    response_from_agent_result,
+)
+from deep_research.db import TaskRecordDB, get_sessionmaker, init_db, utcnow
 from deep_research.logging_setup import get_logger
-from deep_research.research_agent_full import agent
-
-TaskStatus = Literal["pending", "running", "succeeded", "failed", "cancelled"]
 
 logger = get_logger(__name__)
 MAX_QUERY_LOG_CHARS = 200
 MAX_TITLE_WORDS = 7
+INTERRUPTED_TASK_ERROR = "interrupted by server restart"
+MAX_CONCURRENT_TASKS = max(1, int(os.getenv("THINKDEPTH_MAX_CONCURRENCY", "8")))
+# Every worker runs the startup hook, so with several workers a restarting one would
+# fail tasks its live siblings own; such deployments must turn the sweep off.
+FAIL_INTERRUPTED_ON_STARTUP = os.getenv("THINKDEPTH_FAIL_INTERRUPTED_ON_STARTUP", "true").lower() in {"1", "true", "yes"}
 TASK_TITLE_STOPWORDS = {
     "a",
     "an",
@@ -64,8 +76,8 @@ def _summarize_query(query: str) -> dict[str, object]:
     }
 
 
-def _format_task_date(now: datetime) -> str:
-    return now.strftime("%Y-%m-%d")
+def _format_task_date(now: float) -> str:
+    return time.strftime("%Y-%m-%d", time.gmtime(now))
 
 
 def _normalize_title_tokens(query: str) -> list[str]:
@@ -86,6 +98,15 @@ def _serialize_messages(messages: list[Any]) -> list[dict[str, Any]]:
     return serialized
 
 
+@lru_cache(maxsize=1)
+def _get_agent():
+    # Importing the graph initializes every chat model; defer it so importing this
+    # module (e.g. from tests) stays cheap.
+    from deep_research.research_agent_full import agent
+
+    return agent
+
+
 def _langgraph_recursion_limit() -> int:
     explicit = os.getenv("LANGGRAPH_RECURSION_LIMIT")
     if explicit:
@@ -100,199 +121,173 @@ def _langgraph_recursion_limit() -> int:
     return max(25, (2 * max_iterations) + 20)
 
 
-class ResearchRequest(BaseModel):
-    query: str
-    async_mode: bool = Field(default=False, description="Run asynchronously and poll later when true")
-
-
-class ResearchResponse(BaseModel):
-    task_id: Optional[str] = None
-    status: TaskStatus = "succeeded"
-    error: Optional[str] = None
-    research_brief: str | None = None
-    draft_report: str | None = None
-    notes: List[str] = []
-    final_report: str | None = None
-    messages: List[str] = []
-
-
-class TaskRecord(BaseModel):
-    task_id: str
-    status: TaskStatus
-    request: ResearchRequest
-    result: Optional[ResearchResponse] = None
-    error: Optional[str] = None
-    created_at: float
-    updated_at: float
+_RESPONSE_SERIALIZER = ResearchResponse.__pydantic_serializer__
 
 
-class ResearchTaskSummary(BaseModel):
-    task_id: str
-    status: TaskStatus
-    query: str
-    created_at: float
-    updated_at: float
+def _dump_response_json(response: ResearchResponse) -> str:
+    # Null fields are omitted; they all default to None, so the payload round-trips.
+    return _RESPONSE_SERIALIZER.to_json(response, exclude_none=True).decode("utf-8")
 
 
 def _record_from_db(row: TaskRecordDB) -> TaskRecord:
-    request_data = json.loads(row.request_json)
-    result_data = json.loads(row.result_json) if row.result_json else None
-    return TaskRecord(
+    # Rows are written by this service from already-validated models, so skip revalidation.
+    request_data = orjson.loads(row.request_json)
+    result_data = orjson.loads(row.result_json) if row.result_json else None
+    return TaskRecord.model_construct(
         task_id=row.task_id,
-        status=row.status,  # type: ignore[arg-type]
-        request=ResearchRequest(**request_data),
-        result=ResearchResponse(**result_data) if result_data else None,
+        status=row.status,
+        request=ResearchRequest.model_construct(**request_data),
+        result=ResearchResponse.model_construct(**result_data) if result_data else None,
         error=row.error,
-        created_at=row.created_at.timestamp(),
-        updated_at=row.updated_at.timestamp(),
+        created_at=row.created_at,
+        updated_at=row.updated_at,
     )
 
 
 class TaskStore:
     def __init__(self):
-        self.lock = asyncio.Lock()
         self.running_tasks: Dict[str, asyncio.Task] = {}
 
-    async def _task_id_exists(self, task_id: str) -> bool:
-        async with session_scope() as session:
-            row = await session.get(TaskRecordDB, task_id)
-            return row is not None
-
-    async def _build_task_id(self, query: str, now: datetime) -> str:
+    def _task_id_candidates(self, query: str, now: float) -> Iterator[str]:
         date_str = _format_task_date(now)
         base_tokens = _normalize_title_tokens(query)[:MAX_TITLE_WORDS]
-        title_tokens = base_tokens
-        candidate = f"{date_str}_{'_'.join(title_tokens)}"
-        suffix = 2
+        yield f"{date_str}_{'_'.join(base_tokens)}"
 
-        while await self._task_id_exists(candidate):
-            max_tokens = MAX_TITLE_WORDS - 1 if len(base_tokens) >= MAX_TITLE_WORDS else len(base_tokens)
+        max_tokens = MAX_TITLE_WORDS - 1 if len(base_tokens) >= MAX_TITLE_WORDS else len(base_tokens)
+        for suffix in itertools.count(2):
             title_tokens = base_tokens[:max_tokens] + [str(suffix)]
-            candidate = f"{date_str}_{'_'.join(title_tokens)}"
-            suffix += 1
-
-        return candidate
+            yield f"{date_str}_{'_'.join(title_tokens)}"
+
+    async def _update_row(self, task_id: str, **values: Any) -> bool:
+        # Single Core UPDATE ... RETURNING: one round trip, no read-modify-write race
+        # and no ORM hydration. Callers only need to know whether the row existed.
+        stmt = (
+            update(TaskRecordDB)
+            .where(TaskRecordDB.task_id == task_id)
+            .values(updated_at=utcnow(), **values)
+            .returning(TaskRecordDB.task_id)
+        )
+        async with get_sessionmaker().begin() as session:
+            result = await session.execute(stmt)
+            return result.scalar_one_or_none() is not None
 
     async def create(self, request: ResearchRequest) -> TaskRecord:
-        async with self.lock:
-            now = utcnow()
-            task_id = await self._build_task_id(request.query, now)
+        now = utcnow()
+        request_json = request.model_dump_json()
+        # Task ids are derived from the query, so concurrent creates (possibly in other
+        # processes) can pick the same candidate; let the primary key arbitrate and
+        # move on to the next suffix when the insert collides.
+        for task_id in self._task_id_candidates(request.query, now):
             db_row = TaskRecordDB(
                 task_id=task_id,
                 status="pending",
-                request_json=request.model_dump_json(),
+                request_json=request_json,
                 result_json=None,
                 error=None,
                 pending_action_json=None,
                 created_at=now,
                 updated_at=now,
             )
-            async with session_scope() as session:
-                session.add(db_row)
-                await session.commit()
-            logger.info(
-                "Task id assigned",
-                extra={
-                    "task_id": task_id,
-                    "task_date": _format_task_date(now),
-                },
-            )
-            return _record_from_db(db_row)
-
-    async def update(self, task_id: str, status: TaskStatus, result: Optional[ResearchResponse] = None, error: Optional[str] = None) -> Optional[TaskRecord]:
-        async with self.lock:
-            async with session_scope() as session:
-                row = await session.get(TaskRecordDB, task_id)
-                if not row:
-                    return None
-                row.status = status  # type: ignore[assignment]
-                row.result_json = result.model_dump_json() if result else None
-                row.error = error
-                row.updated_at = utcnow()
-                await session.commit()
-                await session.refresh(row)
-                return _record_from_db(row)
+            try:
+                async with get_sessionmaker().begin() as session:
+                    session.add(db_row)
+            except IntegrityError:
+                continue
+            break
+        logger.info(
+            "Task id assigned",
+            extra={
+                "task_id": task_id,
+                "task_date": _format_task_date(now),
+            },
+        )
+        return _record_from_db(db_row)
+
+    async def update(self, task_id: str, status: TaskStatus, result: Optional[ResearchResponse] = None, error: Optional[str] = None) -> bool:
+        return await self._update_row(
+            task_id,
+            status=status,
+            result_json=_dump_response_json(result) if result else None,
+            error=error,
+        )
 
     async def get(self, task_id: str) -> Optional[TaskRecord]:
-        async with self.lock:
-            async with session_scope() as session:
-                result = await session.execute(select(TaskRecordDB).where(TaskRecordDB.task_id == task_id))
-                row = result.scalar_one_or_none()
-                if not row:
-                    return None
-                return _record_from_db(row)
+        async with get_sessionmaker().begin() as session:
+            result = await session.execute(select(TaskRecordDB).where(TaskRecordDB.task_id == task_id))
+            row = result.scalar_one_or_none()
+            if not row:
+                return None
+            return _record_from_db(row)
+
+    async def get_status_payload(self, task_id: str) -> Optional[tuple[str, Optional[str], Optional[str]]]:
+        """Return only (status, result_json, error) so polling never hydrates ORM objects."""
+        stmt = select(TaskRecordDB.status, TaskRecordDB.result_json, TaskRecordDB.error).where(TaskRecordDB.task_id == task_id)
+        async with get_sessionmaker().begin() as session:
+            result = await session.execute(stmt)
+            row = result.one_or_none()
+            if not row:
+                return None
+            return row.status, row.result_json, row.error
 
     async def list(self, status: TaskStatus | None = None) -> List[TaskRecord]:
-        async with self.lock:
-            async with session_scope() as session:
-                stmt = select(TaskRecordDB).order_by(TaskRecordDB.created_at.desc())
-                if status is not None:
-                    stmt = stmt.where(TaskRecordDB.status == status)
-                result = await session.execute(stmt)
-                rows = result.scalars().all()
-                return [_record_from_db(row) for row in rows]
+        async with get_sessionmaker().begin() as session:
+            stmt = select(TaskRecordDB).order_by(TaskRecordDB.created_at.desc())
+            if status is not None:
+                stmt = stmt.where(TaskRecordDB.status == status)
+            result = await session.execute(stmt)
+            rows = result.scalars().all()
+            return [_record_from_db(row) for row in rows]
+
+    async def fail_interrupted(self) -> int:
+        """Mark tasks left pending/running by a previous process as failed."""
+        stmt = (
+            update(TaskRecordDB)
+            .where(TaskRecordDB.status.in_(("pending", "running")))
+            .values(status="failed", error=INTERRUPTED_TASK_ERROR, updated_at=utcnow())
+        )
+        async with get_sessionmaker().begin() as session:
+            result = await session.execute(stmt)
+            return result.rowcount or 0
 
     async def attach_task_handle(self, task_id: str, task: asyncio.Task) -> None:
-        async with self.lock:
-            self.running_tasks[task_id] = task
+        self.running_tasks[task_id] = task
 
     async def pop_task_handle(self, task_id: str) -> Optional[asyncio.Task]:
-        async with self.lock:
-            return self.running_tasks.pop(task_id, None)
-
-    async def cancel_task(self, task_id: str) -> Optional[TaskRecord]:
-        async with self.lock:
-            task = self.running_tasks.get(task_id)
-            if task:
-                task.cancel()
-            async with session_scope() as session:
-                row = await session.get(TaskRecordDB, task_id)
-                if not row:
-                    return None
-                row.status = "cancelled"  # type: ignore[assignment]
-                row.error = "cancelled by user request"
-                row.result_json = None
-                row.updated_at = utcnow()
-                await session.commit()
-                await session.refresh(row)
-                return _record_from_db(row)
+        return self.running_tasks.pop(task_id, None)
+
+    async def cancel_task(self, task_id: str) -> bool:
+        task = self.running_tasks.get(task_id)
+        if task:
+            task.cancel()
+        return await self._update_row(
+            task_id,
+            status="cancelled",
+            error="cancelled by user request",
+            result_json=None,
+        )
 
 
 store = TaskStore()
+if os.getenv("THINKDEPTH_PRELOAD_AGENT", "").lower() in {"1", "true", "yes"}:
+    # Build the graph at import so a forking server that loads the app before
+    # spawning workers (gunicorn --preload) shares it copy-on-write. Sharing the
+    # chat model clients across fork() is safe because building them opens no
+    # connections: their HTTP pools are still empty here, and each worker opens
+    # its own connections on first use. Nothing may call a model before the fork.
+    _get_agent()
+_TASK_SEMAPHORE = asyncio.Semaphore(MAX_CONCURRENT_TASKS)
+_BACKGROUND_TASKS: set[asyncio.Task] = set()
 app = FastAPI(title="ThinkDepth.ai Deep Research")
 
 
 @app.on_event("startup")
 async def _startup() -> None:
     await init_db()
-
-
-def _build_state(query: str, task_id: Optional[str] = None) -> Dict[str, Any]:
-    return {
-        "messages": [HumanMessage(content=query)],
-        "supervisor_messages": [],
-        "raw_notes": [],
-        "notes": [],
-        "draft_report": "",
-        "final_report": "",
-        "research_brief": "",
-        "user_request": query,
-        "task_id": task_id,
-        "research_iterations": 0,
-    }
-
-
-def _response_from_agent_result(result: Dict[str, Any], task_id: Optional[str], status: TaskStatus = "succeeded", error: Optional[str] = None) -> ResearchResponse:
-    return ResearchResponse(
-        task_id=task_id,
-        status=status,
-        error=error,
-        research_brief=result.get("research_brief"),
-        draft_report=result.get("draft_report"),
-        notes=result.get("notes", []),
-        final_report=result.get("final_report"),
-        messages=[m.content if hasattr(m, "content") else str(m) for m in result.get("messages", [])],
-    )
+    _get_agent()
+    if FAIL_INTERRUPTED_ON_STARTUP:
+        interrupted = await store.fail_interrupted()
+        if interrupted:
+            logger.warning("Marked interrupted tasks as failed", extra={"count": interrupted})
 
 
 def _task_artifact_root() -> Path:
@@ -368,7 +363,7 @@ def _export_task_artifacts(
         _write_json_file(task_dir / "state.json", state_snapshot)
 
 
-async def _run_task(task_id: str, request: ResearchRequest) -> None:
+async def _execute_task(task_id: str, request: ResearchRequest) -> None:
     task_logger = get_logger(__name__, task_id=task_id)
     started_at = time.monotonic()
     task_logger.info(
@@ -377,9 +372,9 @@ async def _run_task(task_id: str, request: ResearchRequest) -> None:
     )
     await store.update(task_id, status="running")
     try:
-        state = _build_state(request.query, task_id=task_id)
-        result = await agent.ainvoke(state, config={"recursion_limit": _langgraph_recursion_limit()})
-        response = _response_from_agent_result(result, task_id=task_id, status="succeeded")
+        state = build_state(request.query, task_id=task_id)
+        result = await _get_agent().ainvoke(state, config={"recursion_limit": _langgraph_recursion_limit()})
+        response = response_from_agent_result(result, task_id=task_id, status="succeeded")
         await store.update(task_id, status="succeeded", result=response)
         task_logger.info(
             "Task succeeded",
@@ -411,11 +406,26 @@ async def _run_task(task_id: str, request: ResearchRequest) -> None:
             await asyncio.to_thread(_export_task_artifacts, task_id, request, response, None)
         except Exception:
             task_logger.exception("Failed to export task artifacts after failure")
+
+
+async def _run_task(task_id: str, request: ResearchRequest) -> None:
+    # Queued tasks stay "pending" until a slot frees up, bounding concurrent agent runs.
+    try:
+        async with _TASK_SEMAPHORE:
+            await _execute_task(task_id, request)
     finally:
         await store.pop_task_handle(task_id)
 
 
-@app.post("/research", response_model=ResearchResponse, status_code=200)
+def _start_background_task(task_id: str, request: ResearchRequest) -> asyncio.Task:
+    task = asyncio.create_task(_run_task(task_id, request))
+    # The event loop only keeps weak references to tasks; hold a strong one until done.
+    _BACKGROUND_TASKS.add(task)
+    task.add_done_callback(_BACKGROUND_TASKS.discard)
+    return task
+
+
+@app.post("/research", response_model=ResearchResponse, response_model_exclude_none=True, status_code=200)
 async def run_research(payload: ResearchRequest) -> ResearchResponse:
     logger.info(
         "Research request received",
@@ -430,34 +440,33 @@ async def run_research(payload: ResearchRequest) -> ResearchResponse:
             "Async task created",
             extra={"task_id": record.task_id},
         )
-        task = asyncio.create_task(_run_task(record.task_id, payload))
+        task = _start_background_task(record.task_id, payload)
         await store.attach_task_handle(record.task_id, task)
         return ResearchResponse(task_id=record.task_id, status="pending")
 
     try:
-        state = _build_state(payload.query)
-        result = await agent.ainvoke(state, config={"recursion_limit": _langgraph_recursion_limit()})
+        state = build_state(payload.query)
+        result = await _get_agent().ainvoke(state, config={"recursion_limit": _langgraph_recursion_limit()})
     except Exception as exc:  # pragma: no cover
         logger.exception("Sync research request failed")
         raise HTTPException(status_code=500, detail=str(exc))
 
-    return _response_from_agent_result(result, task_id=None, status="succeeded")
+    return response_from_agent_result(result, task_id=None, status="succeeded")
 
 
-@app.get("/research/{task_id}", response_model=ResearchResponse)
-async def get_research(task_id: str) -> ResearchResponse:
-    record = await store.get(task_id)
-    if not record:
+@app.get("/research/{task_id}", response_class=Response, responses={200: {"model": ResearchResponse}})
+async def get_research(task_id: str) -> Response:
+    payload = await store.get_status_payload(task_id)
+    if not payload:
         raise HTTPException(status_code=404, detail="Task not found")
 
-    if record.result:
-        return record.result
+    status, result_json, error = payload
+    if result_json:
+        # Finished results are immutable; hand back the stored JSON without a pydantic round trip.
+        return Response(content=result_json, media_type="application/json")
 
-    return ResearchResponse(
-        task_id=record.task_id,
-        status=record.status,
-        error=record.error,
-    )
+    response = ResearchResponse.model_construct(task_id=task_id, status=status, error=error)
+    return Response(content=_dump_response_json(response), media_type="application/json")
 
 
 @app.get("/research", response_model=List[ResearchTaskSummary])
@@ -475,7 +484,7 @@ async def list_research(status: TaskStatus | None = None) -> List[ResearchTaskSu
     ]
 
 
-@app.post("/research/{task_id}/cancel", response_model=ResearchResponse)
+@app.post("/research/{task_id}/cancel", response_model=ResearchResponse, response_model_exclude_none=True)
 async def cancel_research(task_id: str) -> ResearchResponse:
     record = await store.get(task_id)
     if not record:
@@ -0,0 +1,81 @@
+"""Request/response models and agent-state helpers for the research API.
+
+Kept free of model and graph imports so the API schema can be loaded without
+initializing any chat models.
+"""
+
+from operator import attrgetter
+from typing import Any, Dict, List, Literal, Optional
+
+from langchain_core.messages import HumanMessage
+from pydantic import BaseModel, Field
+
+TaskStatus = Literal["pending", "running", "succeeded", "failed", "cancelled"]
+
+
+class ResearchRequest(BaseModel):
+    query: str
+    async_mode: bool = Field(default=False, description="Run asynchronously and poll later when true")
+
+
+class ResearchResponse(BaseModel):
+    task_id: Optional[str] = None
+    status: TaskStatus = "succeeded"
+    error: Optional[str] = None
+    research_brief: str | None = None
+    draft_report: str | None = None
+    notes: List[str] = []
+    final_report: str | None = None
+    messages: List[str] = []
+
+
+class TaskRecord(BaseModel):
+    task_id: str
+    status: TaskStatus
+    request: ResearchRequest
+    result: Optional[ResearchResponse] = None
+    error: Optional[str] = None
+    created_at: float
+    updated_at: float
+
+
+class ResearchTaskSummary(BaseModel):
+    task_id: str
+    status: TaskStatus
+    query: str
+    created_at: float
+    updated_at: float
+
+
+def build_state(query: str, task_id: Optional[str] = None) -> Dict[str, Any]:
+    """Build the initial graph state for a research query."""
+    return {
+        "messages": [HumanMessage(content=query)],
+        "supervisor_messages": [],
+        "raw_notes": [],
+        "notes": [],
+        "draft_report": "",
+        "final_report": "",
+        "research_brief": "",
+        "user_request": query,
+        "task_id": task_id,
+        "research_iterations": 0,
+    }
+
+
+# Graph state messages go through add_messages, which coerces everything to BaseMessage.
+_get_content = attrgetter("content")
+
+
+def response_from_agent_result(result: Dict[str, Any], task_id: Optional[str], status: TaskStatus = "succeeded", error: Optional[str] = None) -> ResearchResponse:
+    """Map a finished agent state onto a ResearchResponse."""
+    return ResearchResponse.model_construct(
+        task_id=task_id,
+        status=status,
+        error=error,
+        research_brief=result.get("research_brief"),
+        draft_report=result.get("draft_report"),
+        notes=result.get("notes", []),
+        final_report=result.get("final_report"),
+        messages=list(map(_get_content, result.get("messages", ()))),
+    )
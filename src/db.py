@@ -1,12 +1,11 @@
 """Async database setup for task persistence."""
 
-import json
 import os
-from contextlib import asynccontextmanager
-from datetime import datetime
+import time
 from pathlib import Path
 
-from sqlalchemy import Column, DateTime, String, Text
+import orjson
+from sqlalchemy import Column, Float, Index, String, Text, event
 from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase
 
@@ -20,6 +19,8 @@ class Base(DeclarativeBase):
 
 class TaskRecordDB(Base):
     __tablename__ = "tasks"
+    # Leading status column also serves plain status filters, so no separate status index.
+    __table_args__ = (Index("ix_tasks_status_updated", "status", "updated_at"),)
 
     task_id = Column(String, primary_key=True)
     status = Column(String, nullable=False)
@@ -27,8 +28,9 @@ class TaskRecordDB(Base):
     result_json = Column(Text, nullable=True)
     error = Column(Text, nullable=True)
     pending_action_json = Column(Text, nullable=True)
-    created_at = Column(DateTime, nullable=False)
-    updated_at = Column(DateTime, nullable=False)
+    # Epoch seconds; avoids datetime <-> ISO string conversion on every write and read.
+    created_at = Column(Float, nullable=False)
+    updated_at = Column(Float, nullable=False)
 
 
 _engine: AsyncEngine | None = None
@@ -42,6 +44,17 @@ def _ensure_db_dir(url: str) -> None:
         db_path.parent.mkdir(parents=True, exist_ok=True)
 
 
+def _apply_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    # Per-connection settings: NORMAL sync in WAL mode defers fsync to checkpoints
+    # instead of paying one per committed task update. wal_autocheckpoint=1000 is
+    # SQLite's default; it is set only to make the checkpoint cadence explicit.
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA busy_timeout=5000;")
+    cursor.execute("PRAGMA synchronous=NORMAL;")
+    cursor.execute("PRAGMA wal_autocheckpoint=1000;")
+    cursor.close()
+
+
 def get_engine() -> AsyncEngine:
     global _engine
     if _engine is None:
@@ -49,7 +62,14 @@ def get_engine() -> AsyncEngine:
         if db_url.startswith("sqlite:") and not db_url.startswith("sqlite+aiosqlite:"):
             db_url = db_url.replace("sqlite:", "sqlite+aiosqlite:", 1)
         _ensure_db_dir(db_url)
-        _engine = create_async_engine(db_url, future=True)
+        if db_url.startswith("sqlite"):
+            # Keep the default pool: StaticPool would share one aiosqlite connection
+            # across concurrent transactions and NullPool would reopen the file and
+            # rerun the pragmas on every checkout.
+            _engine = create_async_engine(db_url, future=True)
+            event.listen(_engine.sync_engine, "connect", _apply_sqlite_pragmas)
+        else:
+            _engine = create_async_engine(db_url, future=True, pool_size=20, max_overflow=40, pool_pre_ping=False)
     return _engine
 
 
@@ -60,26 +80,38 @@ def get_sessionmaker() -> async_sessionmaker:
     return _sessionmaker
 
 
-@asynccontextmanager
-async def session_scope():
-    session_factory = get_sessionmaker()
-    async with session_factory() as session:
-        yield session
+def _create_missing_indexes(sync_conn) -> None:
+    for index in TaskRecordDB.__table__.indexes:
+        index.create(sync_conn, checkfirst=True)
+
+
+def _migrate_datetime_columns(sync_conn) -> None:
+    # Rows written before timestamps became epoch floats hold naive UTC DateTime
+    # strings; convert them in place so reads and ORDER BY see only REAL values.
+    for column in ("created_at", "updated_at"):
+        sync_conn.exec_driver_sql(
+            f"UPDATE tasks SET {column} = (julianday({column}) - 2440587.5) * 86400.0 "
+            f"WHERE typeof({column}) = 'text'"
+        )
 
 
 async def init_db() -> None:
     engine = get_engine()
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
-        # Enable WAL for better write concurrency on SQLite
+        # create_all skips tables that already exist, so add indexes introduced later explicitly.
+        await conn.run_sync(_create_missing_indexes)
+        # Enable WAL for better write concurrency on SQLite. Journal mode persists in
+        # the database file; the per-connection pragmas come from _apply_sqlite_pragmas.
         if DB_URL.startswith("sqlite"):
             await conn.exec_driver_sql("PRAGMA journal_mode=WAL;")
-            await conn.exec_driver_sql("PRAGMA busy_timeout=5000;")
+            await conn.run_sync(_migrate_datetime_columns)
 
 
-def json_dumps(obj) -> str:
-    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
+def json_dumps(obj) -> bytes:
+    return orjson.dumps(obj)
 
 
-def utcnow() -> datetime:
-    return datetime.utcnow()
+def utcnow() -> float:
+    """Return the current time as UTC epoch seconds."""
+    return time.time()
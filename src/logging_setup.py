@@ -1,9 +1,11 @@
 """Logging setup for ThinkDepth.ai agents."""
 
+import atexit
 import logging
 import os
+import queue
 import sys
-from logging.handlers import TimedRotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
 from pathlib import Path
 from typing import Any
 from uuid import uuid4
@@ -11,22 +13,72 @@ from uuid import uuid4
 DEFAULT_LOG_DIR = os.getenv("THINKDEPTH_LOG_DIR", "/tmp/thinkdepthai/logs")
 RUN_ID = os.getenv("THINKDEPTH_RUN_ID", uuid4().hex[:8])
 
+_queue_handler: QueueHandler | None = None
+_output_handlers: tuple[logging.Handler, ...] = ()
+_listener: QueueListener | None = None
+
 
 class ContextAdapter(logging.LoggerAdapter):
     """Logger adapter that appends contextual key value pairs to the message."""
 
+    def __init__(self, logger: logging.Logger, extra: dict[str, Any]):
+        """Wrap ``logger`` and pre-format the fixed ``extra`` context."""
+        super().__init__(logger, extra)
+        # Adapter context is fixed for its lifetime, so format it once.
+        self._context_str = " ".join(f"{k}={v}" for k, v in self.extra.items())
+
     def process(self, msg, kwargs):
-        extra = kwargs.get("extra", {})
+        extra = kwargs.get("extra")
+        if not extra:
+            kwargs["extra"] = self.extra
+            if self._context_str:
+                msg = f"{msg} [{self._context_str}]"
+            return msg, kwargs
+
         merged = {**self.extra, **extra}
         kwargs["extra"] = merged
-        if merged:
+        if extra.keys().isdisjoint(self.extra):
+            call_str = " ".join(f"{k}={v}" for k, v in extra.items())
+            context_str = f"{self._context_str} {call_str}" if self._context_str else call_str
+        else:
             context_str = " ".join(f"{k}={v}" for k, v in merged.items())
-            msg = f"{msg} [{context_str}]"
-        return msg, kwargs
+        return f"{msg} [{context_str}]", kwargs
+
+
+def _start_queue_listener() -> None:
+    """Point the queue handler at a fresh queue drained by a new listener thread."""
+    global _listener
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    _queue_handler.queue = log_queue
+    _listener = QueueListener(log_queue, *_output_handlers, respect_handler_level=True)
+    _listener.start()
+
+
+def _stop_queue_listener() -> None:
+    if _listener is not None:
+        _listener.stop()
+
+
+def _restart_queue_listener_after_fork() -> None:
+    # The listener thread does not survive fork(); without a new one the child would
+    # keep filling a queue that nothing drains.
+    if _queue_handler is not None:
+        _start_queue_listener()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_queue_listener_after_fork)
+atexit.register(_stop_queue_listener)
 
 
 def _configure_base_logger() -> logging.Logger:
-    """Configure the shared thinkdepthai logger with file rotation and stdout."""
+    """Configure the shared thinkdepthai logger with file rotation and stdout.
+
+    Records are handed to a QueueHandler and written by a QueueListener thread,
+    so callers on the event loop never block on disk or stdout I/O. Forked
+    children get their own listener via ``_restart_queue_listener_after_fork``.
+    """
+    global _queue_handler, _output_handlers
     logger = logging.getLogger("thinkdepthai")
     if logger.handlers:
         return logger
@@ -53,8 +105,11 @@ def _configure_base_logger() -> logging.Logger:
     stream_handler = logging.StreamHandler(sys.stdout)
     stream_handler.setFormatter(formatter)
 
-    logger.addHandler(file_handler)
-    logger.addHandler(stream_handler)
+    _output_handlers = (file_handler, stream_handler)
+    _queue_handler = QueueHandler(queue.SimpleQueue())
+    _start_queue_listener()
+
+    logger.addHandler(_queue_handler)
     return logger
 
 
@@ -12,7 +12,8 @@ The system orchestrates the complete research workflow from initial user
 input through final report delivery.
 """
 
-from langchain_core.messages import HumanMessage
+from langchain_core.messages import AIMessageChunk, HumanMessage
+from langchain_core.messages.ai import add_ai_message_chunks
 from langgraph.graph import StateGraph, START, END
 
 from deep_research.utils import get_today_str
@@ -25,7 +26,10 @@ from deep_research.logging_setup import get_logger
 # ===== Config =====
 
 from langchain.chat_models import init_chat_model
+import asyncio
+import logging
 import os
+import string
 
 WRITER_MODEL_ID = os.getenv("DEEP_RESEARCH_WRITER_MODEL", os.getenv("DEEP_RESEARCH_MODEL", "openai:gpt-5"))
 WRITER_MAX_TOKENS = int(os.getenv("DEEP_RESEARCH_WRITER_MAX_TOKENS", "40000"))
@@ -36,6 +40,48 @@ logger = get_logger(__name__)
 
 from deep_research.state_scope import AgentState
 
+# Parse the report template once at import; filling it is then a plain join of
+# literal segments and field values with no per-call format-spec parsing.
+_FINAL_REPORT_SEGMENTS = tuple(
+    (literal, field)
+    for literal, field, _spec, _conversion in string.Formatter().parse(
+        final_report_generation_with_helpfulness_insightfulness_hit_citation_prompt
+    )
+)
+
+def _fill_final_report_prompt(**values: object) -> str:
+    """Substitute values into the pre-parsed final report template."""
+    parts: list[str] = []
+    for literal, field in _FINAL_REPORT_SEGMENTS:
+        parts.append(literal)
+        if field is not None:
+            parts.append(str(values[field]))
+    return "".join(parts)
+
+def _slen(value: str | None) -> int:
+    """Length of an optional state string, treating None as empty."""
+    return len(value) if value else 0
+
+def _message_text(content: str | list) -> str:
+    """Return the text of message content given as a string or a list of content blocks."""
+    if isinstance(content, str):
+        return content
+    return "".join(
+        block if isinstance(block, str) else block.get("text", "")
+        for block in content
+        if isinstance(block, str) or block.get("type") == "text"
+    )
+
+def _build_final_report_prompt(state: AgentState, notes: list[str]) -> str:
+    """Join findings and fill the final report template (runs in a worker thread)."""
+    return _fill_final_report_prompt(
+        research_brief=state.get("research_brief", ""),
+        findings="\n".join(notes),
+        date=get_today_str(),
+        draft_report=state.get("draft_report", ""),
+        user_request=state.get("user_request", "")
+    )
+
 async def final_report_generation(state: AgentState):
     """
     Final report generation node.
@@ -45,44 +91,44 @@ async def final_report_generation(state: AgentState):
 
     notes = state.get("notes", [])
 
-    findings = "\n".join(notes)
-
-    logger.info(
-        "Final report generation started",
-        extra={
-            "research_brief_len": len(state.get("research_brief", "") or ""),
-            "findings_count": len(notes),
-            "draft_report_len": len(state.get("draft_report", "") or ""),
-            "task_id": state.get("task_id"),
-        },
-    )
-
-    final_report_prompt = final_report_generation_with_helpfulness_insightfulness_hit_citation_prompt.format(
-        research_brief=state.get("research_brief", ""),
-        findings=findings,
-        date=get_today_str(),
-        draft_report=state.get("draft_report", ""),
-        user_request=state.get("user_request", "")
-    )
-
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(
+            "Final report generation started",
+            extra={
+                "research_brief_len": _slen(state.get("research_brief")),
+                "findings_count": len(notes),
+                "draft_report_len": _slen(state.get("draft_report")),
+                "task_id": state.get("task_id"),
+            },
+        )
+
+    # Joining notes and formatting the multi-KB template can take tens of ms; keep it off the loop.
+    final_report_prompt = await asyncio.to_thread(_build_final_report_prompt, state, notes)
+
+    # Stream the completion so chunks are consumed as they arrive rather than buffered in one response.
+    chunks: list[AIMessageChunk] = []
     try:
-        final_report = await writer_model.ainvoke([HumanMessage(content=final_report_prompt)])
+        async for chunk in writer_model.astream([HumanMessage(content=final_report_prompt)]):
+            chunks.append(chunk)
     except Exception:
         logger.exception("Final report generation failed")
         raise
-
-    logger.info(
-        "Final report generation complete",
-        extra={
-            "final_report_len": len(final_report.content or ""),
-            "notes_used": len(notes),
-            "task_id": state.get("task_id"),
-        },
-    )
+    # Merge once so providers that stream content blocks (not plain strings) are kept intact.
+    final_report = _message_text(add_ai_message_chunks(*chunks).content) if chunks else ""
+
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(
+            "Final report generation complete",
+            extra={
+                "final_report_len": len(final_report),
+                "notes_used": len(notes),
+                "task_id": state.get("task_id"),
+            },
+        )
 
     return {
-        "final_report": final_report.content, 
-        "messages": ["Here is the final report: " + final_report.content],
+        "final_report": final_report, 
+        "messages": ["Here is the final report: " + final_report],
     }
 
 # ===== GRAPH CONSTRUCTION =====